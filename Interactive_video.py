@@ -2,8 +2,8 @@
 # Interactive Video player
 # Version v2.9.6.1 (YAML version) – Modified for transparent interruption overlay
 # with a semi-transparent background behind small, fully opaque interruption choices.
-# Overlays are completely redrawn on scene changes. If there are no temporary
-# choices, the overlay windows are withdrawn (or set to minimal size).
+# Each scene's choice panels are built once and re-shown on later visits. If there
+# are no temporary choices, the overlay windows are withdrawn.
 # When resuming an interruption, the overlay is drawn from the base scene.
 # Base scene settings are preserved if multiple interruptions are clicked.
 # The skip interruption now pauses, sets the time, and then resumes playback,
@@ -17,34 +17,96 @@ from PIL import Image, ImageTk
 import yaml   # <-- Added for YAML support
 import os
 import sys
+import logging
+import hashlib
+import pickle
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 import vlc
 
+# Prefer the libyaml C loader; fall back to the pure-Python loader when unavailable.
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+log = logging.getLogger(__name__)
+
+# PyInstaller unpacks bundled resources to sys._MEIPASS; in development use the working directory.
+_BASE_PATH = getattr(sys, "_MEIPASS", None) or os.path.abspath(".")
+
+@lru_cache(maxsize=None)
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller."""
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+    return os.path.join(_BASE_PATH, relative_path)
+
+def user_cache_dir():
+    """Per-user cache directory for the player.
+    
+    Only the current user can write here, so files loaded from it (pickles in
+    particular) cannot be planted by other local users as they could in /tmp.
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(r"~\AppData\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "interactive-video-player")
+
+THUMBNAIL_SIZE = (119, 158)
+# Prebuffer VLC fills before the first frame of every scene. Scene videos are local
+# files, so a short buffer is enough and keeps scene transitions snappy.
+VLC_CACHING_MS = 300
+# Decode on the GPU: DXVA2 feeds Direct3D9 surfaces directly on Windows; elsewhere let
+# VLC pick any available hardware decoder (it falls back to software on its own).
+VLC_HW_DECODER = "dxva2" if sys.platform == "win32" else "any"
+
+def load_thumbnail(full_image_path):
+    """Decode an image file and resize it to the choice thumbnail size."""
+    img = Image.open(full_image_path)
+    # JPEGs can be decoded at a reduced DCT scale; keep 2x headroom for the resize.
+    # draft() is a no-op for other formats.
+    img.draft("RGB", (THUMBNAIL_SIZE[0] * 2, THUMBNAIL_SIZE[1] * 2))
+    # BILINEAR is indistinguishable from LANCZOS at thumbnail size and much cheaper.
+    return img.resize(THUMBNAIL_SIZE, Image.BILINEAR)
+
+# Per-scene summary built once from the config so lookups don't re-walk the YAML tree.
+SceneInfo = namedtuple("SceneInfo", "scene_type heading interrupt_heading has_temporary "
+                                    "non_temp_choices temp_choices default_next_scene")
+_EMPTY_SCENE = SceneInfo("", "", "", False, (), (), None)
+# Config key holding a scene's heading, by scene type; other types use "heading".
+_HEADING_KEYS = {"continue": "continue_heading", "question": "question_heading"}
 
 class InteractiveVideoApp:
+    # Option button styles; temporary (interruption) choices only differ in colour.
+    _BTN_STYLE_NORMAL = dict(bg="#007ACC", fg="white", font=("Helvetica", 10, "bold"), wraplength=230)
+    _BTN_STYLE_TEMP = dict(_BTN_STYLE_NORMAL, bg="#ff6666")
+    
     def __init__(self, root, config_file):
         self.root = root
         self.root.title("Interactive Video Player")
         
-        # Load configuration from YAML file.
-        try:
-            config_path = resource_path(config_file)
-            with open(config_path, "r") as f:
-                self.config = yaml.safe_load(f)
-        except Exception as e:
-            print("Failed to load configuration:", e)
-            self.config = {}
+        # Load the configuration (and decode the choice thumbnails) and start VLC on worker
+        # threads so both overlap each other and the widget construction below.
+        loader = ThreadPoolExecutor(max_workers=2)
+        startup = loader.submit(self.prepare_config, config_file)
+        vlc_startup = loader.submit(self.init_vlc)
+        loader.shutdown(wait=False)
         
-        # Initialize VLC with Direct3D9 and disable hardware acceleration.
-        self.instance = vlc.Instance("--no-xlib", "--file-caching=2000", "--network-caching=2000",
-                                     "--vout=direct3d9", "--avcodec-hw=none")
-        self.player = self.instance.media_player_new()
+        # VLC's event callbacks run on its input thread and only record state here;
+        # _poll_player applies it on the Tk loop while media is playing.
+        self._media_length = 0          # Cached length of the current media, in ms.
+        self._latest_time = 0           # Last playback time reported by VLC, in ms.
+        self._media_finished = False    # Set by VLC when the media ends or fails.
+        self._vout_ready = False        # Set by VLC once the video output exists.
+        self._poll_id = None            # Pending after() id of _poll_player, if running.
+        self._last_seek_pct = -1        # Whole percent last written to the seek bar by playback.
+        self._pending_seek = None       # Latest seek-slider value awaiting _apply_seek.
+        self._pending_volume = None     # Latest volume awaiting _apply_volume.
+        self._last_pushed_volume = -1   # Volume last sent to VLC; -1 until the first push.
+        self._media_cache = {}          # Resolved video path -> vlc.Media, reused on replays.
         
         # Configure root window using grid.
         self.root.rowconfigure(0, weight=1)
@@ -84,6 +146,10 @@ class InteractiveVideoApp:
         # Normal section for non-temporary choices in the options_frame.
         self.normal_section = tk.Frame(self.options_frame)
         self.normal_section.pack(side=tk.TOP, fill=tk.X)
+        # A single heading label whose text follows the scene being shown.
+        self._heading_var = tk.StringVar()
+        self._heading_label = tk.Label(self.normal_section, textvariable=self._heading_var,
+                                       font=("Arial", 14, "bold"), wraplength=230)
         
         # Permanent controls frame at the bottom of options.
         self.options_controls_frame = tk.Frame(self.options_frame)
@@ -117,49 +183,287 @@ class InteractiveVideoApp:
         self.mute_button = tk.Button(self.bottom_frame, text="Mute", command=self.toggle_mute)
         self.mute_button.grid(row=0, column=3, padx=5, pady=5)
         
+        # Everything below needs the config; PhotoImages must be created on the Tk thread.
+        self._photo_cache = {}  # Resolved image path -> PhotoImage (None if unusable).
+        self.preload_images(startup.result())
+        
         self.current_video = self.config.get("start", "")
         self.resume_video = None  # Holds the base scene ID.
         self.resume_time = 0      # Holds the playback time of the base video.
         
         self.skip_button = None  # For skipping interruptions.
-        self.image_refs = []     # To hold image references.
+        # Requested size of interrupt_fg, re-measured only after its children change.
+        self._fg_req_size = (1, 1)
+        self._fg_req_dirty = True
+        
+        # Choice panels are built once per scene and re-packed on later visits.
+        self._normal_panels = {}
+        self._interrupt_panels = {}
+        self._shown_normal_panel = None
+        self._shown_interrupt_panel = None
+        
+        # Reposition the overlays only when the video area is resized or the window moves.
+        # Container screen position and width, updated from <Configure> events.
+        self._vc_x = self._vc_y = self._vc_width = 0
+        self.video_container.bind("<Configure>", self._on_container_resize)
+        self.root.bind("<Configure>", self._on_root_configure)
+        self.root.bind("<Unmap>", self._on_root_unmap)
+        self.root.bind("<Map>", self._on_root_map)
+        # The overlays are topmost windows; keep them hidden while another application is active.
+        self._overlays_suspended = False
+        # Widgets in the overlay windows carry their own toplevel's bindtag, not the root's,
+        # and clicking a choice can move the focus there; watch all three windows.
+        for window in (self.root, self.interrupt_fg, self.interrupt_bg):
+            window.bind("<FocusOut>", self._on_focus_out)
+            window.bind("<FocusIn>", self._on_focus_in)
+        
+        # The player is first needed from here on.
+        vlc_startup.result()
+        self.event_manager = self.player.event_manager()
+        self.event_manager.event_attach(vlc.EventType.MediaPlayerTimeChanged, self._on_time_changed)
+        # Size the video frame as soon as VLC has created the video output for a media.
+        self.event_manager.event_attach(vlc.EventType.MediaPlayerVout, self._on_vout)
+        # End of playback (or a playback error) is reported by VLC rather than polled.
+        self.event_manager.event_attach(vlc.EventType.MediaPlayerEndReached, self._on_media_finished)
+        self.event_manager.event_attach(vlc.EventType.MediaPlayerEncounteredError, self._on_media_finished)
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Start playing video and set up overlays.
         self.play_video()
-        # Periodically update overlay positions.
-        self.periodic_update_overlay()
+        # Create the remaining scenes' media once the first scene is under way.
+        self.root.after_idle(self.preload_media)
+    
+    def init_vlc(self):
+        """Create the VLC instance and media player; runs on a worker thread during start-up."""
+        # Initialize VLC with Direct3D9 and hardware decoding.
+        self.instance = vlc.Instance("--no-xlib", f"--file-caching={VLC_CACHING_MS}",
+                                     f"--network-caching={VLC_CACHING_MS}",
+                                     "--vout=direct3d9", f"--avcodec-hw={VLC_HW_DECODER}")
+        self.player = self.instance.media_player_new()
+    
+    def load_config(self, config_file):
+        """Load the YAML configuration, reusing a pickled copy from the user's cache directory."""
+        config_path = resource_path(config_file)
+        with open(config_path, "rb") as f:
+            data = f.read()
+        # Key the cache on the file content rather than its path or mtime: a one-file
+        # PyInstaller build extracts the config to a fresh directory on every launch.
+        digest = hashlib.sha1(data).hexdigest()
+        cache_dir = user_cache_dir()
+        cache_path = os.path.join(cache_dir, f"config_{digest}.pkl")
+        try:
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            pass
+        config = yaml.load(data, Loader=_Loader)
+        # Write to a temporary file and swap it in so a crash never leaves a torn cache.
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(config, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            # Without a writable cache directory the player just runs without the cache.
+            log.warning("Could not write configuration cache: %s", e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        else:
+            self.remove_stale_config_caches(cache_dir, os.path.basename(cache_path))
+        return config
+    
+    def remove_stale_config_caches(self, cache_dir, keep):
+        """Delete cached configs other than keep; each edit of the YAML leaves one behind."""
+        try:
+            names = os.listdir(cache_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith("config_") and name.endswith(".pkl") and name != keep:
+                try:
+                    os.remove(os.path.join(cache_dir, name))
+                except OSError:
+                    pass
+    
+    def build_scene_cache(self):
+        """Summarize every scene in the config into a SceneInfo keyed by scene ID."""
+        self._scene_cache = {}
+        for scene_id, options_data in self.config.get("options", {}).items():
+            scene_type = options_data.get("scene_type", "").lower()
+            heading = options_data.get(_HEADING_KEYS.get(scene_type, "heading"), "")
+            choices = options_data.get("choices", {})
+            temp_choices = tuple((text, option) for text, option in choices.items()
+                                 if option.get("temporary", False))
+            non_temp_choices = tuple((text, option) for text, option in choices.items()
+                                     if not option.get("temporary", False))
+            self._scene_cache[scene_id] = SceneInfo(
+                scene_type=scene_type,
+                heading=heading,
+                interrupt_heading=options_data.get("interrupt_heading", ""),
+                has_temporary=bool(temp_choices),
+                non_temp_choices=non_temp_choices,
+                temp_choices=temp_choices,
+                default_next_scene=options_data.get("default_next_scene"),
+            )
+    
+    def resolve_video_paths(self):
+        """Resolve every scene's video path and note the missing files once at load time."""
+        self._resolved_videos = {scene_id: resource_path(path)
+                                 for scene_id, path in self.config.get("videos", {}).items()}
+        self._missing_videos = {scene_id for scene_id, path in self._resolved_videos.items()
+                                if not os.path.exists(path)}
+        for scene_id in sorted(self._missing_videos):
+            log.warning("Video for scene %r not found: %s", scene_id, self._resolved_videos[scene_id])
+    
+    def prepare_config(self, config_file):
+        """Load the config and build the lookup tables; returns the thumbnail decode futures.
+        
+        Runs on a worker thread, so it must not touch Tk.
+        """
+        try:
+            self.config = self.load_config(config_file)
+        except Exception as e:
+            log.error("Failed to load configuration: %s", e)
+            self.config = {}
+        self.build_scene_cache()
+        self.resolve_video_paths()
+        return self.decode_thumbnails()
+    
+    def decode_thumbnails(self):
+        """Decode every choice image referenced by the config; returns {path: future or None}."""
+        paths = {resource_path(option["image"])
+                 for info in self._scene_cache.values()
+                 for _, option in info.non_temp_choices + info.temp_choices
+                 if option.get("image")}
+        # Pillow releases the GIL while decoding and resizing, so the files are processed
+        # in parallel. Missing files map to None.
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            return {path: pool.submit(load_thumbnail, path) if os.path.exists(path) else None
+                    for path in paths}
+    
+    def preload_images(self, thumbnails):
+        """Wrap decoded thumbnails in PhotoImages; Tk is not thread-safe, so call on the Tk thread."""
+        for path, future in thumbnails.items():
+            self._photo_cache[path] = self.make_photo(path, future.result if future else None)
+    
+    def get_photo(self, image_path):
+        """Return the cached thumbnail for an image path, loading it on first use."""
+        full_image_path = resource_path(image_path)
+        if full_image_path not in self._photo_cache:
+            load = None
+            if os.path.exists(full_image_path):
+                load = partial(load_thumbnail, full_image_path)
+            self._photo_cache[full_image_path] = self.make_photo(full_image_path, load)
+        return self._photo_cache[full_image_path]
+    
+    def make_photo(self, full_image_path, load):
+        """Wrap the image returned by load() in a PhotoImage; a None load means the file is missing."""
+        # Missing or broken images are cached as None so they are only reported once.
+        if load is None:
+            log.warning("Image not found: %s", full_image_path)
+            return None
+        try:
+            return ImageTk.PhotoImage(load())
+        except Exception as e:
+            log.warning("Error loading image %s: %s", full_image_path, e)
+            return None
+    
+    def get_scene_info(self, scene_id=None):
+        if scene_id is None:
+            scene_id = self.current_video
+        return self._scene_cache.get(scene_id, _EMPTY_SCENE)
     
     def clear_interrupt_overlays(self):
         """Withdraw both interruption overlay windows."""
         self.interrupt_fg.withdraw()
         self.interrupt_bg.withdraw()
     
-    def periodic_update_overlay(self):
+    def refresh_interrupt_overlay(self):
+        """Show and position the interruption overlays if the base scene has temporary choices."""
         # Determine the base scene: if resuming, use that; otherwise, current scene.
         base_scene = self.resume_video if self.resume_video else self.current_video
-        if self.temporary_choices_exist(base_scene):
+        # Until the container's first <Configure> there is no real geometry to place the
+        # overlays against; _update_container_geometry shows them once it arrives.
+        if (self.temporary_choices_exist(base_scene) and not self._overlays_suspended
+                and self._vc_width):
             self.update_interrupt_geometry()
             self.interrupt_bg.deiconify()
             self.interrupt_fg.deiconify()
             self.interrupt_bg.lift()
             self.interrupt_fg.lift()
         else:
-            self.interrupt_bg.geometry("1x1+0+0")
-            self.interrupt_fg.geometry("1x1+0+0")
-        self.root.after(1000, self.periodic_update_overlay)
+            self.clear_interrupt_overlays()
+    
+    def _on_container_resize(self, event):
+        self._update_container_geometry(event.width)
+    
+    def _on_root_configure(self, event):
+        # Bindings on the root also receive <Configure> for every child widget; only react
+        # to the window itself being moved or resized.
+        if event.widget is self.root:
+            self._update_container_geometry(self._vc_width)
+    
+    def _update_container_geometry(self, width):
+        # Cache the container geometry so overlay placement doesn't have to query Tk for it,
+        # and skip the overlay update when nothing actually moved.
+        geometry = (self.video_container.winfo_rootx(), self.video_container.winfo_rooty(), width)
+        if geometry == (self._vc_x, self._vc_y, self._vc_width):
+            return
+        first_layout = not self._vc_width
+        self._vc_x, self._vc_y, self._vc_width = geometry
+        if first_layout:
+            self.refresh_interrupt_overlay()
+        else:
+            self._reposition_interrupt_overlay()
+    
+    def _on_root_unmap(self, event):
+        # The overlays are separate topmost windows; hide them while the player is minimized.
+        if event.widget is self.root:
+            self.clear_interrupt_overlays()
+    
+    def _on_root_map(self, event):
+        if event.widget is self.root:
+            self.refresh_interrupt_overlay()
+    
+    def _on_focus_out(self, event):
+        # Focus also moves between our own widgets and the overlay windows; wait until the
+        # move has settled to see whether the application as a whole lost focus.
+        self.root.after_idle(self._suspend_overlays_if_unfocused)
+    
+    def _suspend_overlays_if_unfocused(self):
+        # An empty "focus" result means no window of this application has the focus.
+        if not self._overlays_suspended and not self.root.tk.call("focus"):
+            self._overlays_suspended = True
+            self.clear_interrupt_overlays()
+    
+    def _on_focus_in(self, event):
+        if self._overlays_suspended:
+            self._overlays_suspended = False
+            self.refresh_interrupt_overlay()
+    
+    def _reposition_interrupt_overlay(self):
+        # Withdrawn overlays are placed again by refresh_interrupt_overlay when shown.
+        if self.interrupt_fg.state() == "normal":
+            self.update_interrupt_geometry()
     
     def update_interrupt_geometry(self):
         """Position both interruption overlays based on the size of the foreground content."""
         try:
-            self.interrupt_fg.update_idletasks()
-            req_width = self.interrupt_fg.winfo_reqwidth()
-            req_height = self.interrupt_fg.winfo_reqheight()
+            if self._fg_req_dirty:
+                # Only re-measure after the overlay's children changed; a forced layout pass
+                # is not needed just to move the windows.
+                self.interrupt_fg.update_idletasks()
+                self._fg_req_size = (self.interrupt_fg.winfo_reqwidth(),
+                                     self.interrupt_fg.winfo_reqheight())
+                self._fg_req_dirty = False
+            req_width, req_height = self._fg_req_size
             margin = 10
-            vc_x = self.video_container.winfo_rootx()
-            vc_y = self.video_container.winfo_rooty()
-            vc_width = self.video_container.winfo_width()
-            fg_x = vc_x + vc_width - req_width - margin
-            fg_y = vc_y + margin
+            fg_x = self._vc_x + self._vc_width - req_width - margin
+            fg_y = self._vc_y + margin
             self.interrupt_fg.geometry(f"{req_width}x{req_height}+{fg_x}+{fg_y}")
             border = 4
             bg_width = req_width + 2 * border
@@ -168,41 +472,36 @@ class InteractiveVideoApp:
             bg_y = fg_y - border
             self.interrupt_bg.geometry(f"{bg_width}x{bg_height}+{bg_x}+{bg_y}")
         except Exception as e:
-            print("Error updating overlay geometry:", e)
+            log.warning("Error updating overlay geometry: %s", e)
     
     def temporary_choices_exist(self, scene_id=None):
-        if scene_id is None:
-            scene_id = self.current_video
-        options_data = self.config.get("options", {}).get(scene_id, {})
-        choices = options_data.get("choices", {})
-        return any(choice.get("temporary", False) for choice in choices.values())
-    
-    def get_scene_type(self):
-        options_data = self.config.get("options", {}).get(self.current_video, {})
-        return options_data.get("scene_type", "").lower()
-    
-    def get_scene_heading(self, options_data, section):
-        scene_type = options_data.get("scene_type", "").lower()
-        if section == "interrupt":
-            return options_data.get("interrupt_heading", "")
-        else:
-            if scene_type == "continue":
-                return options_data.get("continue_heading", "")
-            elif scene_type == "question":
-                return options_data.get("question_heading", "")
-            else:
-                return options_data.get("heading", "")
+        return self.get_scene_info(scene_id).has_temporary
     
     def toggle_pause(self, event=None):
         self.player.pause()
         self.is_paused = not self.is_paused
+        if self.is_paused:
+            self._stop_polling()
+        elif self.player.get_state() != vlc.State.Ended:
+            # Once the media has ended there is nothing left to poll for until play_video.
+            self._start_polling()
         new_text = "Play" if self.is_paused else "Pause"
         self.pause_button.config(text=new_text)
         self.left_pause_button.config(text=new_text)
     
     def set_volume(self, value):
-        volume = int(value)
-        self.player.audio_set_volume(volume)
+        # Slider drags fire on every step; push only the latest value to VLC every 50 ms.
+        schedule = self._pending_volume is None
+        self._pending_volume = int(value)
+        if schedule:
+            self.root.after(50, self._apply_volume)
+    
+    def _apply_volume(self):
+        volume, self._pending_volume = self._pending_volume, None
+        # The player keeps its volume across media, so only push actual changes.
+        if volume != self._last_pushed_volume:
+            self.player.audio_set_volume(volume)
+            self._last_pushed_volume = volume
     
     def toggle_mute(self):
         self.is_muted = not self.is_muted
@@ -210,34 +509,34 @@ class InteractiveVideoApp:
         self.mute_button.config(text="Unmute" if self.is_muted else "Mute")
     
     def play_video(self, start_time=None):
+        # Callers only update the scene state; all teardown of the previous scene's
+        # overlays and choice panels happens here, once.
         # Withdraw any existing interruption overlays.
         self.clear_interrupt_overlays()
         self.clear_subframes()
-        video_path = resource_path(self.config.get("videos", {}).get(self.current_video, ""))
-        if video_path and os.path.exists(video_path):
-            media = self.instance.media_new(video_path)
+        video_path = self._resolved_videos.get(self.current_video, "")
+        if video_path and self.current_video not in self._missing_videos:
+            media = self.get_media(video_path)
+            self._media_length = 0
+            self._last_seek_pct = -1
             self.player.stop()
+            # stop() has joined the old input thread, so no stale events can follow.
+            self._latest_time = 0
+            self._media_finished = False
+            self._vout_ready = False
             self.player.set_hwnd(self.video_frame.winfo_id())
             self.player.set_media(media)
             self.player.play()
-            self.set_volume(self.volume_var.get())
-            self.root.after(500, self.adjust_window_size)
-            self.root.after(500, self.check_video_end)
-            self.root.after(1000, self.update_seek_bar)
-            
-            self.update_interrupt_geometry()
+            self._start_polling()
+            if self._last_pushed_volume == -1:
+                self.set_volume(self.volume_var.get())
             
-            if self.get_scene_type() == "main":
+            if self.get_scene_info().scene_type == "main":
                 self.show_normal_section()
             
             base_scene = self.resume_video if self.resume_video else self.current_video
-            if self.temporary_choices_exist(base_scene):
-                self.show_interrupt_section(scene_id=base_scene)
-                if self.resume_video:
-                    self.ensure_skip_button()
-            else:
-                self.hide_skip_button()
-                self.clear_interrupt_overlays()
+            self.show_interrupt_section(scene_id=base_scene)
+            self.refresh_interrupt_overlay()
                 
             if start_time is not None:
                 # Pause briefly, set the desired start time, then resume playback.
@@ -252,6 +551,33 @@ class InteractiveVideoApp:
                 self.hide_skip_button()
             if self.temporary_choices_exist():
                 self.show_interrupt_section()
+            self.refresh_interrupt_overlay()
+    
+    def get_media(self, video_path):
+        """Return the cached vlc.Media for a video path, creating it on first use."""
+        media = self._media_cache.get(video_path)
+        if media is None:
+            media = self._media_cache[video_path] = self.instance.media_new(video_path)
+            # Parse the local file's headers in the background on first use.
+            media.parse_with_options(vlc.MediaParseFlag.local, 0)
+        return media
+    
+    def preload_media(self):
+        """Create and start parsing the media of every scene video that exists."""
+        for scene_id, video_path in self._resolved_videos.items():
+            if scene_id not in self._missing_videos:
+                self.get_media(video_path)
+    
+    def on_close(self):
+        """Stop playback and release the VLC objects before closing the window."""
+        self._stop_polling()
+        self.player.stop()
+        for media in self._media_cache.values():
+            media.release()
+        self._media_cache.clear()
+        self.player.release()
+        self.instance.release()
+        self.root.destroy()
     
     def adjust_window_size(self):
         width = self.player.video_get_width()
@@ -259,44 +585,52 @@ class InteractiveVideoApp:
         if width > 0 and height > 0:
             self.video_frame.config(width=width, height=height)
     
-    def check_video_end(self):
-        state = self.player.get_state()
-        if state == vlc.State.Ended or state == vlc.State.Error:
-            if self.resume_video:
-                self.root.after(500, self.skip_interrupt)
-            else:
-                scene_type = self.get_scene_type()
-                if scene_type == "main":
-                    options_data = self.config.get("options", {}).get(self.current_video, {})
-                    default_next_scene = options_data.get("default_next_scene")
-                    if default_next_scene:
-                        self.root.after(1000, lambda: self.auto_advance_main_scene(default_next_scene))
-                    else:
-                        self.clear_subframes()
-                        self.show_normal_section()
+    def _on_vout(self, event):
+        # Runs on VLC's input thread, so only flag it for _poll_player. The video
+        # dimensions are known once an output exists.
+        if event.u.new_count > 0:
+            self._vout_ready = True
+    
+    def _on_media_finished(self, event):
+        # Runs on VLC's input thread, which must not call into libvlc or Tk; _poll_player
+        # picks the flag up on the Tk loop.
+        self._media_finished = True
+    
+    def on_video_end(self):
+        if self.resume_video:
+            self.root.after(500, self.skip_interrupt)
+        else:
+            info = self.get_scene_info()
+            if info.scene_type == "main":
+                default_next_scene = info.default_next_scene
+                if default_next_scene:
+                    self.root.after(1000, lambda: self.auto_advance_main_scene(default_next_scene))
                 else:
                     self.clear_subframes()
                     self.show_normal_section()
-        else:
-            self.root.after(500, self.check_video_end)
+            else:
+                self.clear_subframes()
+                self.show_normal_section()
     
     def auto_advance_main_scene(self, next_scene_id):
         if self.player.get_state() == vlc.State.Ended:
             self.current_video = next_scene_id
-            self.clear_options()
-            self.clear_subframes()
             self.play_video()
     
     def hide_skip_button(self):
-        if self.skip_button and self.skip_button.winfo_exists():
+        # The skip button is only destroyed here, so None reliably means "no button"
+        # and no winfo_exists() round-trip to Tcl is needed.
+        if self.skip_button is not None:
             self.skip_button.destroy()
             self.skip_button = None
+            self._fg_req_dirty = True
     
     def ensure_skip_button(self):
-        if not self.skip_button or not self.skip_button.winfo_exists():
+        if self.skip_button is None:
             self.skip_button = tk.Button(self.interrupt_fg, text="Skip Interruption",
                                           command=self.skip_interrupt, wraplength=230)
             self.skip_button.pack(pady=10)
+            self._fg_req_dirty = True
     
     def skip_interrupt(self):
         if self.resume_video:
@@ -305,146 +639,191 @@ class InteractiveVideoApp:
             self.resume_video = None
             saved_time = self.resume_time
             self.resume_time = 0
-            self.clear_subframes()
             self.play_video(start_time=saved_time)
     
-    def clear_options(self):
-        for widget in list(self.options_frame.winfo_children()):
-            if widget not in [self.options_controls_frame, self.normal_section]:
-                if widget.winfo_exists():
-                    widget.destroy()
-        self.image_refs = []
-    
     def clear_subframes(self):
-        for frame in (self.normal_section,):
-            for widget in list(frame.winfo_children()):
-                try:
-                    widget.destroy()
-                except:
-                    pass
-        for widget in list(self.interrupt_fg.winfo_children()):
-            try:
-                widget.destroy()
-            except:
-                pass
+        """Hide the choice panels currently shown; they stay built for the next visit."""
+        # Each section is only touched if something is shown in it, so clearing an
+        # already empty section costs no Tk calls.
+        if self._shown_normal_panel is not None:
+            self._shown_normal_panel.pack_forget()
+            self._heading_label.pack_forget()
+            self._shown_normal_panel = None
+        if self._shown_interrupt_panel is not None:
+            self._shown_interrupt_panel.pack_forget()
+            self._shown_interrupt_panel = None
+            self._fg_req_dirty = True
+        self.hide_skip_button()
+    
+    def _on_time_changed(self, event):
+        # Runs on VLC's input thread, which player.stop() on the Tk thread waits for, so it
+        # must not call into Tk (not even root.after); just record the time.
+        self._latest_time = event.u.new_time
+    
+    def _start_polling(self):
+        if self._poll_id is None:
+            self._poll_id = self.root.after(250, self._poll_player)
+    
+    def _stop_polling(self):
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+    
+    def _poll_player(self):
+        """Apply the state recorded by VLC's callbacks; runs on the Tk loop during playback."""
+        self._poll_id = None
+        if self._vout_ready:
+            self._vout_ready = False
+            self.adjust_window_size()
+        self.update_seek_bar()
+        if self._media_finished:
+            # Playback is over, so stop polling; on_video_end decides what plays next.
+            self._media_finished = False
+            self.on_video_end()
+        else:
+            self._start_polling()
     
     def update_seek_bar(self):
-        if self.player.get_length() > 0:
-            current_time = self.player.get_time()
-            self.seek_var.set((current_time / self.player.get_length()) * 100)
-        self.root.after(1000, self.update_seek_bar)
+        if self._media_length <= 0:
+            # The length is fixed for a given media; query VLC until it is known.
+            self._media_length = self.player.get_length()
+        if self._media_length > 0:
+            # The slider moves in whole percents; only touch it when that value changes.
+            pct = self._latest_time * 100 // self._media_length
+            # While a drag is still waiting for _apply_seek, leave the slider to the user.
+            if pct != self._last_seek_pct and self._pending_seek is None:
+                self._last_seek_pct = pct
+                self.seek_var.set(pct)
     
     def seek_video(self, value):
-        if self.player.get_length() > 0:
-            new_time = (float(value) / 100) * self.player.get_length()
-            self.player.set_time(int(new_time))
+        # Tk also invokes the command (at idle) when update_seek_bar moves the slider;
+        # seeking to where playback already is would only make VLC stutter.
+        if float(value) == self._last_seek_pct:
+            return
+        # The user moved the slider away; the next playback update must be written again.
+        self._last_seek_pct = -1
+        # Coalesce slider motion so VLC sees at most one seek every 33 ms.
+        schedule = self._pending_seek is None
+        self._pending_seek = float(value)
+        if schedule:
+            self.root.after(33, self._apply_seek)
     
-    def create_option_button(self, parent, text, option):
-        bg_color = "#ff6666" if option.get("temporary", False) else "#007ACC"
+    def _apply_seek(self):
+        value, self._pending_seek = self._pending_seek, None
+        if self._media_length <= 0:
+            self._media_length = self.player.get_length()
+        if self._media_length > 0:
+            new_time = int((value / 100) * self._media_length)
+            self.player.set_time(new_time)
+            # VLC reports the new position only with its next time event; record it now so
+            # the next poll does not write the pre-seek position back into the slider.
+            self._latest_time = new_time
+    
+    def create_option_button(self, parent, text, option, pady=0):
+        # Whether a choice interrupts is fixed by the config, so pick its handler once here.
+        if option.get("temporary", False):
+            style, handler = self._BTN_STYLE_TEMP, self.start_interruption
+        else:
+            style, handler = self._BTN_STYLE_NORMAL, self.choose_scene
         btn = tk.Button(parent, text=text,
-                        command=lambda opt=option: self.handle_option(opt),
-                        bg=bg_color, fg="white",
-                        font=("Helvetica", 10, "bold"), wraplength=230)
-        btn.pack()
+                        command=partial(handler, option.get("next")),
+                        **style)
+        btn.pack(pady=pady)
     
     def create_option_frame(self, text, option, parent):
+        image_path = option.get("image")
+        photo = self.get_photo(image_path) if image_path else None
+        if photo is None:
+            # Without a thumbnail there is nothing to group; skip the wrapper frame.
+            self.create_option_button(parent, text, option, pady=5)
+            return
         frame = tk.Frame(parent, bg='white')
         frame.pack(pady=5)
-        image_path = option.get("image")
-        if image_path:
-            full_image_path = resource_path(image_path)
-            if os.path.exists(full_image_path):
-                try:
-                    img = Image.open(full_image_path)
-                    img = img.resize((119, 158), Image.LANCZOS)
-                    photo = ImageTk.PhotoImage(img)
-                    lbl = tk.Label(frame, image=photo, bg='white')
-                    lbl.photo = photo
-                    lbl.pack()
-                    self.image_refs.append(photo)
-                except Exception as e:
-                    print(f"Error loading image {full_image_path}: {e}")
-            else:
-                print(f"Image not found: {full_image_path}")
+        lbl = tk.Label(frame, image=photo, bg='white')
+        lbl.pack()
         self.create_option_button(frame, text, option)
     
+    def build_interrupt_panel(self, scene_id):
+        """Build the heading and temporary choices of a scene's interruption overlay."""
+        panel = tk.Frame(self.interrupt_fg, bg='white')
+        info = self.get_scene_info(scene_id)
+        if info.interrupt_heading:
+            lbl = tk.Label(panel, text=info.interrupt_heading,
+                           font=("Arial", 14, "bold"), wraplength=230, bg='white')
+            lbl.pack(pady=5)
+        for text, option in info.temp_choices:
+            self.create_option_frame(text, option, panel)
+        return panel
+    
+    def build_normal_panel(self, scene_id):
+        """Build the non-temporary choices shown in the options frame."""
+        panel = tk.Frame(self.normal_section)
+        info = self.get_scene_info(scene_id)
+        for text, option in info.non_temp_choices:
+            self.create_option_frame(text, option, panel)
+        return panel
+    
     def show_interrupt_section(self, scene_id=None):
-        for widget in list(self.interrupt_fg.winfo_children()):
-            try:
-                widget.destroy()
-            except:
-                pass
         if scene_id is None:
             scene_id = self.current_video
-        options_data = self.config.get("options", {}).get(scene_id, {})
-        heading = options_data.get("interrupt_heading", "")
-        if heading:
-            lbl = tk.Label(self.interrupt_fg, text=heading,
-                           font=("Arial", 14, "bold"), wraplength=230, bg='white')
-            lbl.pack(pady=5)
-        choices = options_data.get("choices", {})
-        for text, option in choices.items():
-            if option.get("temporary", False):
-                self.create_option_frame(text, option, self.interrupt_fg)
+        if not self.get_scene_info(scene_id).has_temporary:
+            # Nothing to show: skip all widget work and keep the overlays hidden.
+            self.clear_interrupt_overlays()
+            return
+        self.hide_skip_button()
+        if self._shown_interrupt_panel is not None:
+            self._shown_interrupt_panel.pack_forget()
+        # Panels are built on a scene's first visit and re-packed on later visits.
+        panel = self._interrupt_panels.get(scene_id)
+        if panel is None:
+            panel = self._interrupt_panels[scene_id] = self.build_interrupt_panel(scene_id)
+        panel.pack()
+        self._shown_interrupt_panel = panel
+        self._fg_req_dirty = True
         self.ensure_skip_button()
-        self.interrupt_fg.deiconify()
-        self.update_interrupt_geometry()
+        # Callers finish with refresh_interrupt_overlay(), which lays out and places the
+        # overlay once after all of its children are packed.
     
     def show_normal_section(self):
-        for widget in list(self.normal_section.winfo_children()):
-            try:
-                widget.destroy()
-            except:
-                pass
-        options_data = self.config.get("options", {}).get(self.current_video, {})
-        stype = options_data.get("scene_type", "").lower()
-        if stype == "continue":
-            heading = options_data.get("continue_heading", "")
-        elif stype == "question":
-            heading = options_data.get("question_heading", "")
-        else:
-            heading = options_data.get("heading", "")
+        if self._shown_normal_panel is not None:
+            self._shown_normal_panel.pack_forget()
+        heading = self.get_scene_info().heading
+        self._heading_var.set(heading)
         if heading:
-            lbl = tk.Label(self.normal_section, text=heading,
-                           font=("Arial", 14, "bold"), wraplength=230)
-            lbl.pack(pady=5)
-        choices = options_data.get("choices", {})
-        for text, option in choices.items():
-            if not option.get("temporary", False):
-                self.create_option_frame(text, option, self.normal_section)
-    
-    def show_interrupt_options(self):
-        self.clear_options()
-        if self.temporary_choices_exist():
-            self.show_interrupt_section()
-    
-    def handle_option(self, option):
-        next_video = option.get("next")
-        if option.get("temporary", False):
-            if self.resume_video is None:
-                self.resume_video = self.current_video
-                self.resume_time = self.player.get_time()
+            # Packing an already packed widget keeps its place above the choices.
+            self._heading_label.pack(pady=5)
+        else:
+            self._heading_label.pack_forget()
+        panel = self._normal_panels.get(self.current_video)
+        if panel is None:
+            panel = self._normal_panels[self.current_video] = self.build_normal_panel(self.current_video)
+        panel.pack(fill=tk.X)
+        self._shown_normal_panel = panel
+    
+    def start_interruption(self, next_video):
+        """Play a temporary choice's scene, remembering where the base scene was left."""
+        if self.resume_video is None:
+            self.resume_video = self.current_video
+            self.resume_time = self.player.get_time()
+        self.current_video = next_video
+        self.play_video()
+    
+    def choose_scene(self, next_video):
+        """Play a permanent choice's scene, resuming the base video's time after an interruption."""
+        if self.resume_video:
+            # Leaving the interruption for good: clear the resume state first so play_video
+            # draws the overlay for the new scene rather than the old base scene.
+            resume_time = self.resume_time
+            self.resume_video = None
             self.current_video = next_video
-            self.clear_options()
-            self.clear_subframes()
             self.play_video()
+            self.player.set_time(resume_time)
         else:
-            if self.resume_video:
-                self.current_video = next_video
-                self.clear_options()
-                self.clear_subframes()
-                self.play_video()
-                self.player.set_time(self.resume_time)
-                self.resume_video = None
-            else:
-                self.current_video = next_video
-                self.clear_options()
-                self.clear_subframes()
-                self.play_video()
-        if self.temporary_choices_exist():
-            self.show_interrupt_section()
+            self.current_video = next_video
+            self.play_video()
     
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
     root = tk.Tk()
     app = InteractiveVideoApp(root, "config.yaml")
     root.mainloop()